@@ -1,15 +1,31 @@
 #!/usr/bin/env python3
-#pip install pypng
+#pip install pypng numpy
+#Optionally, pip install orjson for faster glTF output
+#and pillow for --fast-png
 
-from struct import pack, unpack, calcsize
+from struct import pack, unpack, unpack_from, calcsize, Struct
+from concurrent.futures import ProcessPoolExecutor
 import collections
+import functools
 import argparse
 import binascii
+import mmap
 import json
 import png
+import numpy as np
 import sys
 import os
 
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	from PIL import Image
+except ImportError:
+	Image = None
+
 def mkdir (path):
 	try:
 		os.mkdir (path)
@@ -21,9 +37,36 @@ def verify (cond, msg):
 	if not cond:
 		raise Exception (msg)
 		
+def json_save (path, obj):
+	#orjson is a lot quicker on the big actor files
+	if orjson is not None:
+		with open (path, 'wb') as f:
+			f.write (orjson.dumps (obj, option = orjson.OPT_SERIALIZE_NUMPY))
+		return
+
+	with open (path, 'w') as f:
+		f.write (json.dumps (obj))
+		
 def cstr_decode (data):
-	zero = data.index (0)
-	return data[:zero].decode ('ASCII').lower ()
+	#NB: a string filling the whole field has no terminator; take it all
+	return bytes (data).partition (b'\x00')[0].decode ('ASCII').lower ()
+
+#Records that get parsed over and over, compiled once
+SMT_PARAM = Struct ('<I3f3f3f3f')
+SSK_BONE = Struct ('<32sI21f96sII')
+SSN_BIND = Struct ('<3I')
+SSN_MPLX = Struct ('<4I3f')
+SMF_STRIP = Struct ('<IHHI')
+BIN_DIR = Struct ('<II32sI')
+BIN_FILE = Struct ('<32sII')
+PVR_HEADER = Struct ('<BBHHH')
+
+#Expands 1, 4, 5 and 6 bit colour channels to 8 bits by replicating the
+#top bits into the bottom; 0 and the maximum map exactly to 0 and 255
+LUT1 = np.array ([0, 255], dtype=np.uint8)
+LUT4 = ((np.arange (16)<<4)|(np.arange (16)   )).astype (np.uint8)
+LUT5 = ((np.arange (32)<<3)|(np.arange (32)>>2)).astype (np.uint8)
+LUT6 = ((np.arange (64)<<2)|(np.arange (64)>>4)).astype (np.uint8)
 
 #Keep track of assets by symbolic name
 sskdb = {}
@@ -31,6 +74,9 @@ ssndb = {}
 scfdb = {}
 smtdb = {}
 
+#Per file chatter is only printed with --verbose
+verbose = False
+
 fspaths = []
 def open_file (path, mode):
 	global fspaths
@@ -42,7 +88,32 @@ def open_file (path, mode):
 	
 	raise Exception (f'Could not open "{path}"!')
 
-def pvr_decode (data):
+#Spreads the bits of v out to the even bits of the result
+#This is what BMI2's pdep (v, 0x55555555) does in one instruction
+def spread (v):
+	v = (v|(v<<8))&0x00ff00ff
+	v = (v|(v<<4))&0x0f0f0f0f
+	v = (v|(v<<2))&0x33333333
+	v = (v|(v<<1))&0x55555555
+	return v
+
+#This is my favourite black magic spell!
+#Interleaves x and y to produce a morton code
+#This trivialises decoding PVR images
+#Builds the morton index of every pixel of a width x height image, row by
+#row, with the spreads done once per axis and a single broadcast OR
+#Lots of textures share dimensions, so hang on to these
+#NB: stored as intp since that's what numpy indexes with anyway
+@functools.lru_cache (maxsize = 32)
+def morton_table (width, height):
+	i = spread (np.arange (height, dtype=np.uint32))
+	#Square textures are the common case; both axes share one spread
+	j = i if width == height else spread (np.arange (width, dtype=np.uint32))
+	table = (i[:, None]|(j[None, :]<<1)).astype (np.intp)
+	table.flags.writeable = False
+	return table
+
+class PVR:
 	#Some PVR constants
 	HEADER_SIZE = 16
 	CODEBOOK_SIZE = 2048
@@ -102,126 +173,128 @@ def pvr_decode (data):
 		'SMALL VQ MIPMAP',
 		'SQUARE TWIDDLED MIPMAP ALT'
 	]
-	
+
+#Colour decoders...
+#These take an array of 16 bit pixels and return an array of bytes
+#with the channels stacked along a new last axis
+def unpack1555 (colour):
+	a = LUT1[(colour>>15)&1]
+	r = LUT5[(colour>>10)&31]
+	g = LUT5[(colour>> 5)&31]
+	b = LUT5[(colour    )&31]
+	return np.stack ([r, g, b, a], axis = -1)
+	
+def unpack4444 (colour):
+	a = LUT4[(colour>>12)&15]
+	r = LUT4[(colour>> 8)&15]
+	g = LUT4[(colour>> 4)&15]
+	b = LUT4[(colour    )&15]
+	return np.stack ([r, g, b, a], axis = -1)
+
+def unpack565 (colour):
+	r = LUT5[(colour>>11)&31]
+	g = LUT6[(colour>> 5)&63]
+	b = LUT5[(colour    )&31]
+	return np.stack ([r, g, b], axis = -1)
+
+#Format decoders...
+#GOTCHA: PVR stores mipmaps from smallest to largest!
+#NB: both decoders hand back a generator of bands of scanlines, so the
+#png writer can compress each band while it's still warm in cache
+#Everything that can fail is done before that, so a bad texture never
+#leaves a half written png behind
+def vq_decode (raw, width, height, decoder):
+	needed = PVR.HEADER_SIZE + PVR.CODEBOOK_SIZE + width*height//4 + 10
+	verify (needed <= len (raw), f'texture is {len (raw)} bytes; {width}x{height} VQ needs {needed}')
+	
+	#Extract the codebook and decode all 256 entries up front
+	#The codebook is a 2x2 block of 16 bit pixels
+	#Blocks are stored column by column, so entries 0 and 2 make up
+	#the top row and 1 and 3 the bottom; flip them to row by row
+	book = np.frombuffer (raw, dtype='<u2', count = PVR.CODEBOOK_SIZE//2, offset = PVR.HEADER_SIZE)
+	book = decoder (book)
+	book = book.reshape (-1, 2, 2, book.shape[-1]).transpose (0, 2, 1, 3)
+	
+	#Skip to the largest mipmap
+	#NB: This also avoids another gotcha:
+	#Between the codebook and the mipmap data is a padding byte
+	#Since we only want the largest though, it doesn't affect us
+	#There is 10 byte padding at the end of VQ'd images
+	size = len (raw) - 10
+	base = width*height//4
+	lut = np.frombuffer (raw, dtype=np.uint8, count = base, offset = size - base)
+	
+	#This effectively halves the image dimensions
+	#Each index of the data refers to a codebook entry
+	#Every row of blocks makes up two scanlines
+	table = morton_table (width//2, height//2)
+	rows = max (1, 16384//width)
+	def bands ():
+		for top in range (0, height//2, rows):
+			pix = book[lut[table[top : top + rows]]]
+			
+			#Interleave the block rows into scanlines
+			pix = pix.transpose (0, 2, 1, 3, 4)
+			yield pix.reshape (2*len (pix), -1)
+	return bands ()
+
+def morton_decode (raw, width, height, decoder):
+	#Skip to largest mipmap; it's always the last one
+	base = width*height
+	needed = PVR.HEADER_SIZE + 2*base
+	verify (needed <= len (raw), f'texture is {len (raw)} bytes; {width}x{height} needs {needed}')
+	data = np.frombuffer (raw, dtype='<u2', count = base, offset = len (raw) - 2*base)
+	
+	#Gather the pixels through a morton index table a band of rows at a
+	#time; this keeps the decoder's temporaries in cache on big textures
+	table = morton_table (width, height)
+	rows = max (1, 32768//width)
+	def bands ():
+		for top in range (0, height, rows):
+			pix = decoder (data[table[top : top + rows]])
+			yield pix.reshape (len (pix), -1)
+	return bands ()
+
+#From observation:
+#All textures 16 bit
+#All textures are either VQ'd or morton coded (twiddled)
+#So let's just save time and only implement those
+PVR_DECODERS = {
+	(PVR.ARGB1555, PVR.SQUARE_TWIDDLED): (morton_decode, unpack1555, 'RGBA'),
+	(PVR.ARGB1555, PVR.SQUARE_TWIDDLED_MIPMAP): (morton_decode, unpack1555, 'RGBA'),
+	(PVR.ARGB1555, PVR.VQ): (vq_decode, unpack1555, 'RGBA'),
+	(PVR.ARGB1555, PVR.VQ_MIPMAP): (vq_decode, unpack1555, 'RGBA'),
+	(PVR.ARGB4444, PVR.SQUARE_TWIDDLED): (morton_decode, unpack4444, 'RGBA'),
+	(PVR.ARGB4444, PVR.SQUARE_TWIDDLED_MIPMAP): (morton_decode, unpack4444, 'RGBA'),
+	(PVR.ARGB4444, PVR.VQ): (vq_decode, unpack4444, 'RGBA'),
+	(PVR.ARGB4444, PVR.VQ_MIPMAP): (vq_decode, unpack4444, 'RGBA'),
+	(PVR.RGB565, PVR.SQUARE_TWIDDLED): (morton_decode, unpack565, 'RGB'),
+	(PVR.RGB565, PVR.SQUARE_TWIDDLED_MIPMAP): (morton_decode, unpack565, 'RGB'),
+	(PVR.RGB565, PVR.VQ): (vq_decode, unpack565, 'RGB'),
+	(PVR.RGB565, PVR.VQ_MIPMAP): (vq_decode, unpack565, 'RGB')
+}
+
+def pvr_decode (data):
 	#Ensure the texture is PVR encoded
-	if data[:4].decode ('ASCII', 'ignore') != 'PVRT':
-		return 'Not a PVR texture!', ''
+	if data[:4] != b'PVRT':
+		return 'Not a PVR texture!', '', 0, 0
 	
 	#Extract header
-	px, fmt, unk, width, height = unpack ('<BBHHH', data[8:HEADER_SIZE])
+	px, fmt, unk, width, height = PVR_HEADER.unpack_from (data, 8)
 
 	#Print info and verify
-	print (f'    Type: {TYPES[px]} {FMTS[fmt]}, Size: {width}x{height}')
-	verify (width < MAX_WIDTH, f'width is {width}; must be < {MAX_WIDTH}')
-	verify (height < MAX_HEIGHT, f'height is {height}; must be < {MAX_HEIGHT}')
-	
-	#This is my favourite black magic spell!
-	#Interleaves x and y to produce a morton code
-	#This trivialises decoding PVR images
-	def morton (x, y):
-		x = (x|(x<<8))&0x00ff00ff
-		y = (y|(y<<8))&0x00ff00ff
-		x = (x|(x<<4))&0x0f0f0f0f
-		y = (y|(y<<4))&0x0f0f0f0f
-		x = (x|(x<<2))&0x33333333
-		y = (y|(y<<2))&0x33333333
-		x = (x|(x<<1))&0x55555555	
-		y = (y|(y<<1))&0x55555555
-		return x|(y<<1)
-	
-	#Colour decoders...
-	def unpack1555 (colour):
-		a = int (255*((colour>>15)&31))
-		r = int (255*((colour>>10)&31)/31.0)
-		g = int (255*((colour>> 5)&31)/31.0)
-		b = int (255*((colour    )&31)/31.0)
-		return [r, g, b, a]
-		
-	def unpack4444 (colour):
-		a = int (255*((colour>>12)&15)/15.0)
-		r = int (255*((colour>> 8)&15)/15.0)
-		g = int (255*((colour>> 4)&15)/15.0)
-		b = int (255*((colour    )&15)/15.0)
-		return [r, g, b, a]
-	
-	def unpack565 (colour):
-		r = int (255*((colour>>11)&31)/31.0)
-		g = int (255*((colour>> 5)&63)/63.0)
-		b = int (255*((colour    )&31)/31.0)
-		return [r, g, b]
-	
-	#Format decoders...
-	#GOTCHA: PVR stores mipmaps from smallest to largest!
-	def vq_decode (raw, decoder):
-		pix = []
-		
-		#Extract the codebook
-		tmp = raw[HEADER_SIZE:]
-		book = unpack (f'<1024H', tmp[:CODEBOOK_SIZE])
-		
-		#Skip to the largest mipmap
-		#NB: This also avoids another gotcha:
-		#Between the codebook and the mipmap data is a padding byte
-		#Since we only want the largest though, it doesn't affect us
-		#There is 10 byte padding at the end of VQ'd images
-		size = len (raw) - 10
-		base = width*height//4
-		lut = raw[size - base : size]
-		
-		#The codebook is a 2x2 block of 16 bit pixels
-		#This effectively halves the image dimensions
-		#Each index of the data refers to a codebook entry
-		for i in range (height//2):
-			row0 = []
-			row1 = []
-			for j in range (width//2):
-				entry = 4*lut[morton (i, j)]
-				row0.extend (decoder (book[entry + 0]))
-				row1.extend (decoder (book[entry + 1]))
-				row0.extend (decoder (book[entry + 2]))
-				row1.extend (decoder (book[entry + 3]))
-			pix.append (row0)
-			pix.append (row1)
-		return pix
-	
-	def morton_decode (raw, decoder):
-		pix = []
-		
-		#Skip to largest mipmap
-		size = len (raw)
-		base = width*height*2
-		mip = raw[size - base : size]
-		
-		data = unpack (f'<{width*height}H', mip)
-		for i in range (height):
-			row = []
-			for j in range (width):
-				row.extend (decoder (data[morton (i, j)]))
-			pix.append (row)
-		return pix
-	
-	#From observation:
-	#All textures 16 bit
-	#All textures are either VQ'd or morton coded (twiddled)
-	#So let's just save time and only implement those
-	if ARGB1555 == px:
-		if SQUARE_TWIDDLED == fmt or SQUARE_TWIDDLED_MIPMAP == fmt:
-			return morton_decode (data, unpack1555), 'RGBA'
-		elif VQ == fmt or VQ_MIPMAP:
-			return vq_decode (data, unpack1555), 'RGBA'
-	elif ARGB4444 == px:
-		if SQUARE_TWIDDLED == fmt or SQUARE_TWIDDLED_MIPMAP == fmt:
-			return morton_decode (data, unpack4444), 'RGBA'
-		elif VQ == fmt or VQ_MIPMAP:
-			return vq_decode (data, unpack4444), 'RGBA'
-	elif RGB565 == px:
-		if SQUARE_TWIDDLED == fmt or SQUARE_TWIDDLED_MIPMAP == fmt:
-			return morton_decode (data, unpack565), 'RGB'
-		elif VQ == fmt or VQ_MIPMAP:
-			return vq_decode (data, unpack565), 'RGB'
+	if verbose:
+		print (f'    Type: {PVR.TYPES[px]} {PVR.FMTS[fmt]}, Size: {width}x{height}')
+	verify (width < PVR.MAX_WIDTH, f'width is {width}; must be < {PVR.MAX_WIDTH}')
+	verify (height < PVR.MAX_HEIGHT, f'height is {height}; must be < {PVR.MAX_HEIGHT}')
+	verify (0 < width and 0 < height, f'size is {width}x{height}; must not be empty')
 	
 	#Oh, well...
-	return 'Unsupported encoding', ''
+	if (px, fmt) not in PVR_DECODERS:
+		return 'Unsupported encoding', '', 0, 0
+	
+	decode, decoder, mode = PVR_DECODERS[(px, fmt)]
+	return decode (data, width, height, decoder), mode, width, height
 
 def smt_load (data):
 	Params = collections.namedtuple ('Params', ['col0', 'col1', 'col2', 'col3'])
@@ -231,21 +304,16 @@ def smt_load (data):
 		return 'Malformed material!', '', ''
 	
 	tag = cstr_decode (data[:32])
-	tmp = data[32:]
-	
-	count = unpack ('<I', tmp[:4])[0]
-	tmp = tmp[4:]
+	count = unpack_from ('<I', data, 32)[0]
+	off = 36
 	
 	params = []
 	for i in range (count):
-		PARAM_FMT = '<I3f3f3f3f'
-		PARAM_SIZE = calcsize (PARAM_FMT)
-		
 		unk0,\
 		col0x, col0y, col0z,\
 		col1x, col1y, col1z,\
 		col2x, col2y, col2z,\
-		col3x, col3y, col3z = unpack (PARAM_FMT, tmp[:PARAM_SIZE])
+		col3x, col3y, col3z = SMT_PARAM.unpack_from (data, off)
 		
 		params.append (Params (\
 				  [col0x, col0y, col0z],\
@@ -253,12 +321,12 @@ def smt_load (data):
 				  [col2x, col2y, col2z],\
 				  [col3x, col3y, col3z]))
 	
-		tmp = tmp[PARAM_SIZE:]
+		off += SMT_PARAM.size
 	
 	tags = []
 	for i in range (count):
-		tags.append (cstr_decode (tmp[:32]))
-		tmp = tmp[32:]
+		tags.append (cstr_decode (data[off : off + 32]))
+		off += 32
 	
 	return tags, params, count
 
@@ -271,26 +339,25 @@ def ssk_symbolic_name (data):
 def ssk_load (data):
 	FMT = '<5I32s'
 	SIZE = calcsize (FMT)
-	BONE_FMT = '<32sI21f96sII'
-	BONE_SIZE = calcsize (BONE_FMT)
 	Bone = collections.namedtuple ('Bone', ['tag', 'index', 'children', 'rows'])
 	size, unk0, nbones, unk1, unk2, tag = unpack (FMT, data[:SIZE])
 
 	bl = []
-	bones = data[SIZE:]
-	offset = bones[BONE_SIZE*nbones:]
-	hierarchy = list (unpack (f'<{nbones - 1}I', offset[:calcsize (f'<{nbones - 1}I')]))
+	mv = memoryview (data)
+	off = SIZE
+	hierarchy = unpack_from (f'<{nbones - 1}I', mv, SIZE + SSK_BONE.size*nbones)
+	first = 0
 	for i in range (nbones):
 		tag, index,\
 		m00, m01, m02, m03, m04, m05, m06, m07, m08, m09, m10,\
 		m11, m12, m13, m14, m15, m16, m17, m18, m19, m20,\
-		pad, nchildren, unk = unpack (BONE_FMT, bones[:BONE_SIZE])
+		pad, nchildren, unk = SSK_BONE.unpack_from (mv, off)
 
 		tag = cstr_decode (tag)
 
 		#Slice off the relevant indices from the hierarchy list
-		children = hierarchy[:nchildren]
-		hierarchy = hierarchy[nchildren:]
+		children = list (hierarchy[first : first + nchildren])
+		first += nchildren
 		bl.append (Bone (tag, index, children, [
 			[m00, m01, m02, m03],
 			[m04, m05, m06, m07],
@@ -301,7 +368,7 @@ def ssk_load (data):
 		]))
 
 		#Advance to the next entry
-		bones = bones[BONE_SIZE:]
+		off += SSK_BONE.size
 	
 	return bl
 
@@ -324,27 +391,24 @@ def ssn_load (data):
 	size, unk0, count, multiplexed,\
 	unk1, unk2, unk3,\
 	tag = unpack (HEADER_FMT, data[:HEADER_SIZE])
-	data = data[HEADER_SIZE:]
+	mv = memoryview (data)
+	off = HEADER_SIZE
 	
 	book = []
 	for i in range (count):
-		BIND_SIZE = calcsize ('<3I')
-		bone, count, offset = unpack ('<3I', data[:BIND_SIZE])
+		bone, count, offset = SSN_BIND.unpack_from (mv, off)
 		
 		book.append (Binding (bone, count, offset))
-		data = data[BIND_SIZE:]
+		off += SSN_BIND.size
 		
 	mplx = []
 	for i in range (multiplexed):
-		MPLX_FMT = '<4I3f'
-		MPLX_SIZE = calcsize (MPLX_FMT)
-		
-		count, b0, b1, b2, w0, w1, w2 = unpack (MPLX_FMT, data[:MPLX_SIZE])
+		count, b0, b1, b2, w0, w1, w2 = SSN_MPLX.unpack_from (mv, off)
 		mplx.append (Multiplex (count, [b0, b1, b2], [w0, w1, w2]))
-		data = data[MPLX_SIZE:]
+		off += SSN_MPLX.size
 		
 		#Skip the offsets
-		data = data[4*16:]
+		off += 4*16
 		
 		
 	return book, mplx
@@ -379,7 +443,7 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 	scf = skel is not None
 	
 	#Buffer to store the binary data
-	binfile = bytes ()
+	binfile = bytearray ()
 	
 	#Get arrays for the gltf fields
 	accessors = gltf['accessors'] if 'accessors' in gltf else []
@@ -435,12 +499,13 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 	unk7, unk8, unk9, unk10,\
 	count = unpack (HEADER_FMT, data[:HEADER_SIZE])
 
-	tmp = data[HEADER_SIZE + calcsize ('<54I'):]
-	tag = cstr_decode (tmp[:32]);
-	tmp = tmp[32:]
+	mv = memoryview (data)
+	off = HEADER_SIZE + calcsize ('<54I')
+	tag = cstr_decode (data[off : off + 32]);
+	off += 32
 	
 	#Unknown data
-	tmp = tmp[13*4:]
+	off += 13*4
 	
 	#Song and dance for scf files
 	pose = []
@@ -450,13 +515,13 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		#Generate skin
 		#The vertices are already stored relative to bones,
 		#so we can just use the identity matrix here
-		mats = bytes ()
+		mats = bytearray ()
 		for i in range (len (skel)):
 			mat4 = [1.0, 0.0, 0.0, 0.0,
 					0.0, 1.0, 0.0, 0.0,
 					0.0, 0.0, 1.0, 0.0,
 					0.0, 0.0, 0.0, 1.0]
-			mats += pack ('<16f', *mat4)
+			mats.extend (pack ('<16f', *mat4))
 			
 		views.append ({
 			'buffer': len (buffers),
@@ -475,7 +540,7 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 			'inverseBindMatrices': len (accessors) - 1,
 			'joints': [x for x in range (0, len (skel))]
 		})
-		binfile += mats
+		binfile.extend (mats)
 		del mats
 		
 		#Generate accessors for the weights
@@ -486,18 +551,23 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		with open_file (ssndb[filename], 'rb') as f:
 			binds, mplx = ssn_load (f.read ())
 			
-			joints = []
-			weights = []
+			#Bound verts hang off a single bone with full weight,
+			#multiplexed verts follow them with up to three
+			total = sum (b.count for b in binds) + len (mplx)
+			joints = np.zeros ((total, 4), dtype='<u4')
+			weights = np.zeros ((total, 4), dtype='<f4')
+			p = 0
 			for b in binds:
-				joints += b.count*[b.bone, 0, 0, 0]
-				weights += b.count*[1.0, 0.0, 0.0, 0.0]
+				joints[p : p + b.count, 0] = b.bone
+				weights[p : p + b.count, 0] = 1.0
+				p += b.count
 
-			for m in mplx:
-				joints += [m.bones[0], m.bones[1], m.bones[2], 0]
-				weights += [m.bias[0], m.bias[1], m.bias[2], 0.0]
+			if mplx:
+				joints[p:, :3] = [m.bones for m in mplx]
+				weights[p:, :3] = [m.bias for m in mplx]
 			
 			#View/accessor for joints
-			joint_bin = pack (f'{len (joints)}I', *joints)
+			joint_bin = joints.tobytes ()
 			joint_accessor = len (accessors)
 			views.append ({
 				'buffer': len (buffers),
@@ -510,14 +580,14 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 				'byteOffset': 0,
 				'type': 'VEC4',
 				'componentType': GLTF.UNSIGNED_INT,
-				'count': len (joints)//4
+				'count': len (joints)
 			})
-			binfile += joint_bin
+			binfile.extend (joint_bin)
 			del joints
 			del joint_bin
 
 			#View/accessor for weights
-			weight_bin = pack (f'{len (weights)}f', *weights)
+			weight_bin = weights.tobytes ()
 			weight_accessor = len (accessors)
 			views.append ({
 				'buffer': len (buffers),
@@ -530,18 +600,17 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 				'byteOffset': 0,
 				'type': 'VEC4',
 				'componentType': GLTF.FLOAT,
-				'count': len (weights)//4
+				'count': len (weights)
 			})
-			binfile += weight_bin
+			binfile.extend (weight_bin)
 			del weights
 			del weight_bin
 	
 	#Repack position data and create a view/accessor for it
-	vtx = bytes ()
-	for i in range (nverts):
-		x, y, z, w = unpack ('<4f', tmp[:4*4])
-		vtx += pack ('<3f', x, y, z)
-		tmp = tmp[4*4:]
+	#Vertices are stored as xyzw; drop the w
+	vtx = np.frombuffer (data, dtype='<f4', count=4*nverts, offset=off)
+	vtx = vtx.reshape (nverts, 4)[:, :3].tobytes ()
+	off += 4*4*nverts
 	
 	position_accessor = len (accessors)
 	views.append ({
@@ -557,15 +626,13 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		'componentType': GLTF.FLOAT,
 		'count': nverts
 	})
-	binfile += vtx
+	binfile.extend (vtx)
 	del vtx
 		
 	#Repack normal data and create a view/accessor for it
-	nml = bytes ()
-	for i in range (nverts):
-		x, y, z, w = unpack ('<4f', tmp[:4*4])	
-		nml += pack ('<3f', x, y, z)
-		tmp = tmp[4*4:]
+	nml = np.frombuffer (data, dtype='<f4', count=4*nverts, offset=off)
+	nml = nml.reshape (nverts, 4)[:, :3].tobytes ()
+	off += 4*4*nverts
 	
 	normal_accessor = len (accessors)
 	views.append ({
@@ -581,21 +648,19 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		'componentType': GLTF.FLOAT,
 		'count': nverts
 	})
-	binfile += nml
+	binfile.extend (nml)
 	del nml
 	
 	#Unknown data
-	tmp = tmp[nverts*4*3:]
-	tmp = tmp[count*4:]
+	off += nverts*4*3
+	off += count*4
 	
 	strips = []
-	ndx = bytes ()
-	txc = bytes ()
+	ndx = bytearray ()
+	txc = bytearray ()
 	for i in range (count):
-		STRIP_FMT = '<IHHI'
-		STRIP_SIZE = calcsize (STRIP_FMT)
-		unk0, slot, flags1, nelem = unpack (STRIP_FMT, tmp[:STRIP_SIZE])
-		tmp = tmp[STRIP_SIZE:]
+		unk0, slot, flags1, nelem = SMF_STRIP.unpack_from (mv, off)
+		off += SMF_STRIP.size
 		
 		nndx = len (ndx)
 		ntxc = len (txc)
@@ -603,15 +668,15 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		#Indices and UVs are written out in 8 element granularities
 		aligned = (nelem + 7)&~7;
 			
-		#Repack index data into the blob
-		indices = list (unpack (f'<{aligned}I', tmp[:4*aligned]))
-		ndx += pack (f'<{nelem}I', *indices[:nelem])
-		tmp = tmp[4*aligned:]
+		verify (off + 4*3*aligned <= len (data), f'Strip {i} runs past the end of the data')
+		
+		#Copy index data into the blob, minus the padding
+		ndx.extend (mv[off : off + 4*nelem])
+		off += 4*aligned
 		
 		#Append the UVs to the blob	
-		uvs = list (unpack (f'<{2*aligned}f', tmp[:4*2*aligned]))
-		txc += pack (f'<{2*nelem}f', *uvs[:2*nelem])
-		tmp = tmp[4*2*aligned:]
+		txc.extend (mv[off : off + 4*2*nelem])
+		off += 4*2*aligned
 		
 		strips.append (Strip (nelem, slot, nndx, ntxc))
 		
@@ -622,7 +687,7 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		'byteLength': len (ndx),
 		'byteStride': 0
 	})
-	binfile += ndx
+	binfile.extend (ndx)
 	del ndx
 	
 	texco_view = len (views)
@@ -632,7 +697,7 @@ def smf_decode (data, prefix, filename, skel, gltf, matname):
 		'byteLength': len (txc),
 		'byteStride': 0
 	})
-	binfile += txc
+	binfile.extend (txc)
 	del txc
 	
 	#Format the strips out as primitives
@@ -736,85 +801,63 @@ def saf_decode (data, prefix, filename, skel, animset):
 	tag,\
 	flags, unk0, unk1, unk2,\
 	fps, version, count = unpack (HEADER_FMT, data[:HEADER_SIZE])
-	tmp = data[HEADER_SIZE:]
+	mv = memoryview (data)
+	off = HEADER_SIZE
 	
 	verify (1 == version, f'Version is not 1!')
 	
 	count += 2
-	offsets = list (unpack (f'{count}I', tmp[:4*count]))
-	tmp = tmp[4*count:]
+	offsets = np.frombuffer (data, dtype='<u4', count=count, offset=off)
+	off += 4*count
 	
 	#Do some simple verification
 	#This catches the corrupted 'e05_boneskel_throw_11' animation
 	#in a general sort of way
 	size = len (data)
-	for pos in offsets:
-		verify (pos < size, f'Offset "{pos}" outside of data ({size})')
+	pos = int (offsets.max ())
+	verify (pos < size, f'Offset "{pos}" outside of data ({size})')
 	
 	#This is kind of a hack, but logically sound
-	nbones = (offsets[1] - offsets[0])//4//4 - 1
+	nbones = (int (offsets[1]) - int (offsets[0]))//4//4 - 1
 	if len (skel) != nbones:
 		print (f'        animation references {nbones} bones; skeleton only has {len (skel)}!')
 		return {}
 	
-	times = []
-	rotations = []
+	#Each key is a time stamp, rotations for each bone,
+	#and the position for the root joint
+	KEY = np.dtype ([
+		('time', '<u4'),
+		('rotation', '<f4', (nbones, 4)),
+		('base', '<f4', 4)
+	])
+	keys = np.frombuffer (data, dtype=KEY, count=count, offset=off)
+	off += KEY.itemsize*count
+	
 	positions = None
-	basepos = []
-	for i in range (count):
-		times.append (unpack ('<I', tmp[:4])[0])
-		tmp = tmp[4:]
-		
-		#Rotations for each bone 
-		data = []
-		for j in range (nbones):
-			data.append (unpack ('<4f', tmp[:4*4]))
-			tmp = tmp[4*4:]
-		
-		#Position for root joint
-		basepos.append ([unpack ('<4f', tmp[:4*4])])
-		tmp = tmp[4*4:]
-		
-		rotations.append (data)
 	
 	#Skip the event data
 	if flags&HAS_EVENTS:
-		nevents, unk3 = unpack ('<2I', tmp[:4*2])
-		tmp = tmp[4*2 + 36*nevents:]
+		nevents, unk3 = unpack_from ('<2I', mv, off)
+		off += 4*2 + 36*nevents
 		
-	#Position keys
+	#Position keys, one per bone for each key
 	if flags&HAS_POSITIONS:
-		positions = []
-		for i in range (count):
-			data = []
-			for j in range (nbones):
-				data.append (unpack ('<4f', tmp[:4*4]))
-				tmp = tmp[4*4:]
-			
-			positions.append (data)
+		positions = np.frombuffer (data, dtype='<f4', count=count*nbones*4, offset=off)
+		positions = positions.reshape (count, nbones, 4)
+		off += positions.nbytes
 	
 	animations = animset['animations'] if 'animations' in animset else []
 	views = animset['bufferViews'] if 'bufferViews' in animset else []
 	accessors = animset['accessors'] if 'accessors' in animset else []
 	buffers = animset['buffers'] if 'buffers' in animset else []
-	samplers = []
-	channels = []
-	
-	tbin = bytes ()
-	rbin = bytes ()
-	pbin = bytes ()
-	for i in range (1, count - 1):
-		tbin += pack ('<f', times[i]/fps)
-		
-		for k in rotations[i]:
-			rbin += pack ('<4f', *k)
-		
-		if None is not positions:
-			for k in positions[i]:
-				pbin += pack ('<4f', *k)
-		else:
-			for k in basepos[i]:
-				pbin += pack ('<4f', *k)			
+	
+	#The first and last keys are dropped
+	tbin = (keys['time'][1:-1]/fps).astype ('<f4').tobytes ()
+	rbin = keys['rotation'][1:-1].tobytes ()
+	if None is not positions:
+		pbin = positions[1:-1].tobytes ()
+	else:
+		pbin = keys['base'][1:-1].tobytes ()
 	
 	binfile = tbin + rbin + pbin
 	
@@ -868,69 +911,52 @@ def saf_decode (data, prefix, filename, skel, animset):
 		'count': count - 2
 	})
 	
+	#Lay the channels out column by column; the accessor, sampler and
+	#channel objects for all of them get built in one pass below
+	targets = []
+	paths = []
+	banks = []
+	starts = []
+	
 	#Create bone data
 	for i in range (nbones):
-		accessors.append ({
-			'bufferView': view_index + 1,
-			'byteOffset': i*16,
-			'type': 'VEC4',
-			'componentType': GLTF.FLOAT,
-			'count': count - 2		
-		})
-		samplers.append ({
-			'input': time_keys,
-			'interpolation': 'LINEAR',
-			'output': len (accessors) - 1
-		})
-		channels.append ({
-			'target': {
-				'node': i,
-				'path': 'rotation'
-			},
-			'sampler': len (samplers) - 1
-		})
+		targets.append (i)
+		paths.append ('rotation')
+		banks.append (view_index + 1)
+		starts.append (i*16)
 		if None is not positions:
-			accessors.append ({
-				'bufferView': view_index + 2,
-				'byteOffset': i*16,
-				'type': 'VEC4',
-				'componentType': GLTF.FLOAT,
-				'count': count - 2		
-			})
-			samplers.append ({
-				'input': time_keys,
-				'interpolation': 'LINEAR',
-				'output': len (accessors) - 1
-			})
-			channels.append ({
-				'target': {
-					'node': i,
-					'path': 'translation'
-				},
-				'sampler': len (samplers) - 1
-			})
+			targets.append (i)
+			paths.append ('translation')
+			banks.append (view_index + 2)
+			starts.append (i*16)
 	
 	#Just emit base positions
 	if None is positions:
-		accessors.append ({
-			'bufferView': view_index + 2,
-			'byteOffset': 0,
-			'type': 'VEC4',
-			'componentType': GLTF.FLOAT,
-			'count': count - 2		
-		})
-		samplers.append ({
-			'input': time_keys,
-			'interpolation': 'LINEAR',
-			'output': len (accessors) - 1
-		})
-		channels.append ({
-			'target': {
-				'node': 0,
-				'path': 'translation'
-			},
-			'sampler': len (samplers) - 1
-		})
+		targets.append (0)
+		paths.append ('translation')
+		banks.append (view_index + 2)
+		starts.append (0)
+	
+	first = len (accessors)
+	accessors.extend ({
+		'bufferView': bank,
+		'byteOffset': start,
+		'type': 'VEC4',
+		'componentType': GLTF.FLOAT,
+		'count': count - 2
+	} for bank, start in zip (banks, starts))
+	samplers = [{
+		'input': time_keys,
+		'interpolation': 'LINEAR',
+		'output': first + i
+	} for i in range (len (targets))]
+	channels = [{
+		'target': {
+			'node': node,
+			'path': path
+		},
+		'sampler': i
+	} for i, (node, path) in enumerate (zip (targets, paths))]
 			
 	animations.append ({
 		'channels': channels,
@@ -948,15 +974,70 @@ def saf_decode (data, prefix, filename, skel, animset):
 class Lex:
 	def __init__ (self, data):
 		self.lines = [x for x in data.decode ().splitlines () if x != '']
+		self.cursor = 0
 	
 	def next (self):
-		if len (self.lines) == 0:
+		if self.cursor >= len (self.lines):
 			return ''
 
-		ln = self.lines[0].strip ()
-		self.lines = self.lines[1:]
+		ln = self.lines[self.cursor].strip ()
+		self.cursor += 1
 		return ln
 	
+#Textures and models convert independently of each other,
+#so these get farmed out to worker processes
+def worker_init (paths, chatty):
+	global fspaths, verbose
+	fspaths = paths
+	verbose = chatty
+
+def texture_convert (fast, path):
+	#An odd texture shouldn't take the rest of the run down with it
+	try:
+		#The raw file was only just written, so this comes out of the page cache
+		with open (path, 'rb') as f:
+			data = f.read ()
+		ret, mode, width, height = pvr_decode (data)
+		verify (str != type (ret), f'image "{path}" failed to decode: {ret}!')
+	except Exception as e:
+		print (f'ERROR: {e}')
+		return
+
+	#Pillow encodes in C; low compression trades a little size for speed
+	#It wants the whole image at once though
+	if fast and Image is not None:
+		pixels = np.concatenate (list (ret)).reshape (height, width, len (mode))
+		Image.fromarray (pixels).save (path + '.png', compress_level = 1)
+		return
+
+	#Rows are streamed to the writer as each band is decoded
+	w = png.Writer (width, height, greyscale = False, alpha = 'A' in mode)
+	with open (path + '.png', 'wb') as f:
+		w.write (f, (row for band in ret for row in band))
+
+def model_convert (prefix, mdl):
+	try:
+		if verbose:
+			print (f'  {mdl}')
+		with open_file (os.path.join ('smf', mdl), 'rb') as f:
+			gltf = {
+				'asset': {
+					'generator': "Castlevania: Resurrection Tools",
+					'version': '2.0'
+				}
+			}
+
+			gltf.update (smf_decode (f.read (), prefix, mdl, None, gltf, mdl))
+			
+			gltf['scenes'] = [
+				{'nodes': [x for x in range (len (gltf['nodes']))]}
+			]
+
+			json_save (os.path.join (prefix, f'{mdl}.gltf'), gltf)
+
+	except Exception as e:
+		print (f'ERROR: {e}')	
+
 def readbin (path, args):
 	global sskdb, ssndb, scfdb
 	
@@ -1032,44 +1113,57 @@ def readbin (path, args):
 	#Create prefix directory where to store everything
 	mkdir (args.prefix)
 	
+	#Everything goes under a directory named after the bin
+	bfn = os.path.splitext (os.path.split (path)[1])[0].lower ()
+	bin_path = os.path.join (args.prefix, bfn)
+	
 	#Try to open a stream to the blob
 	try:
 		with open (path, 'rb') as f:
 			file_length = os.fstat (f.fileno ()).st_size
 			print (f'Reading "{path}"...')
 			print (f'Length: {file_length}')
+			mkdir (bin_path)
+
+			#Map the blob rather than reading it piecemeal;
+			#the OS pages it in as we walk through it
+			#NB: mmap refuses empty files, but then there's nothing to read
+			mm = mmap.mmap (f.fileno (), 0, access = mmap.ACCESS_READ) if file_length else b''
+			view = memoryview (mm)
+			pos = 0
 
 			#There seems to be no directory count, so in order to read
 			#all the directories we have to go until the end of file
-			while f.tell () < file_length:
-				unk0, unk1 = unpack ('<II', f.read (8))
-				dn = cstr_decode (f.read (32))
+			while pos < file_length:
+				unk0, unk1, dn, nfiles = BIN_DIR.unpack_from (mm, pos)
+				pos += BIN_DIR.size
+				dn = cstr_decode (dn)
 				print (f'Reading directory "{dn}"...')
-
-				nfiles = unpack ('<I', f.read (4))[0]
-				print (f'  Files: {nfiles}')
+				if verbose:
+					print (f'  Files: {nfiles}')
 				
-				#Grab bin name
-				bfn = os.path.splitext (os.path.split (path)[1])[0].lower ()
-				mkdir (os.path.join (args.prefix, bfn))
-				mkdir (os.path.join (args.prefix, bfn, dn))
+				dir_path = os.path.join (bin_path, dn)
+				mkdir (dir_path)
+				dnl = dn.lower ()
 
 				for i in range (nfiles):
 					#Read the file header...
-					fn = cstr_decode (f.read (32))
-					sz, unk3 = unpack ('<II', f.read (8))
-					fp = f.tell ()
-					print (f'  Reading file "{fn}" ({sz}) ({unk3}) @ {fp} ({i})...')
+					fn, sz, unk3 = BIN_FILE.unpack_from (mm, pos)
+					pos += BIN_FILE.size
+					fn = cstr_decode (fn)
+					if verbose:
+						print (f'  Reading file "{fn}" ({sz}) ({unk3}) @ {pos} ({i})...')
 
 					#Now for the file contents...
-					op = os.path.join (args.prefix, bfn, dn, fn)
-					data = f.read (sz)
+					#NB: this is a view into the mapping, not a copy
+					op = os.path.join (dir_path, fn)
+					data = view[pos : pos + sz]
+					pos += sz
 
 					#Actor definitions refer to assets via a symbolic name,
 					#so we have to map the files to their symbolic names,
 					#which means... we have to peek them.... sigh...
 					#NB: a symbolic name is NOT necessarily the same as the file name
-					dnl = dn.lower ()
 					if 'ssk' == dnl:
 						sskdb[ssk_symbolic_name (data)] = os.path.join (dn, fn)
 					elif 'ssn' == dnl:
@@ -1082,6 +1176,8 @@ def readbin (path, args):
 						if args.models:
 							models.append (fn)
 					elif 'textures' == dnl:
+						#Workers read these back themselves, so only
+						#one texture per worker is in memory at a time
 						if args.textures:
 							textures.append (op)
 					else:
@@ -1089,17 +1185,22 @@ def readbin (path, args):
 						#This because there is no other linkage between model and animation,
 						#and the animations need a skeleton to display properly
 						if '_animsets.txt' in fn:
-							animset_script = data
+							animset_script = bytes (data)
 
 						if '_actors.txt' in fn:
-							actor_script = data
+							actor_script = bytes (data)
 					
-					#Write the raw binary data
+					#Write the raw binary data straight out of the mapping
 					with open (op, 'wb') as cont:
 						cont.write (data)
+					data.release ()
 
 					#Skip to the next page boundary
-					f.seek ((f.tell () + (ALIGNMENT - 1))&~(ALIGNMENT - 1))
+					pos = (pos + (ALIGNMENT - 1))&~(ALIGNMENT - 1)
+			
+			view.release ()
+			if file_length:
+				mm.close ()
 				
 	except FileNotFoundError:
 		print (f'Could not open stream to "{path}"; ignoring...')
@@ -1109,45 +1210,22 @@ def readbin (path, args):
 	if args.raw:
 		return
 	
-	#Convert textures to png
-	if args.textures:
-		print ('Converting textures...')
-		for txt in textures:
-			with open (txt, 'rb') as f:		
-				ret, mode = pvr_decode (f.read ())
-				verify (str != type (ret), f'image "{txt}" failed to decode: {ret}!')
-				png.from_array (ret, mode).save (txt + '.png')
-
-	#Convert models to glTF
-	if args.models:
-		print ('Converting models...')
-		for mdl in models:
-			try:
-				print (f'  {mdl}')
-				with open_file (os.path.join ('smf', mdl), 'rb') as f:
-					gltf = {
-						'asset': {
-							'generator': "Castlevania: Resurrection Tools",
-							'version': '2.0'
-						}
-					}
-
-					gltf.update (smf_decode (f.read (), os.path.join (args.prefix, bfn, 'smf'), mdl, None, gltf, mdl))
-					
-					gltf['scenes'] = [
-						{'nodes': [x for x in range (len (gltf['nodes']))]}
-					]
-
-					with open (os.path.join (args.prefix, bfn, 'smf', f'{mdl}.gltf'), 'w') as f:
-						f.write (json.dumps (gltf))
+	#Convert textures to png and models to glTF
+	with ProcessPoolExecutor (initializer = worker_init, initargs = (fspaths, verbose)) as ex:
+		if args.textures:
+			print ('Converting textures...')
+			convert = functools.partial (texture_convert, args.fast_png)
+			list (ex.map (convert, textures, chunksize = 4))
 
-			except Exception as e:
-				print (f'ERROR: {e}')	
+		if args.models:
+			print ('Converting models...')
+			convert = functools.partial (model_convert, os.path.join (bin_path, 'smf'))
+			list (ex.map (convert, models))
 		
 	#Pull together actors
 	if args.actors:
 		#Store all these files in their own directory
-		actor_path = os.path.join (args.prefix, bfn, 'actors')
+		actor_path = os.path.join (bin_path, 'actors')
 		mkdir (actor_path)
 		#Parse the data out from the scripts
 		animset_parse (animset_script)
@@ -1183,9 +1261,10 @@ def readbin (path, args):
 					}
 					gltf.update ({'nodes': skel[:]})
 
-					print (f'      {num:2}/{len (animset):2} "{anim}"...')
+					if verbose:
+						print (f'      {num:2}/{len (animset):2} "{anim}"...')
 					with open_file (os.path.join ('saf', anim), 'rb') as f:
-						obj = saf_decode (f.read (), os.path.join (args.prefix, bfn, 'actors'), anim, skel, gltf)
+						obj = saf_decode (f.read (), actor_path, anim, skel, gltf)
 						gltf.update (obj)
 
 					num += 1
@@ -1193,14 +1272,13 @@ def readbin (path, args):
 					mdl = {}
 					with open_file (scfdb[v[0]], 'rb') as f:
 						matname = smtdb[v[0]]
-						mdl = smf_decode (f.read (), os.path.join (args.prefix, bfn, 'actors'), v[0], skel, gltf, matname)
+						mdl = smf_decode (f.read (), actor_path, v[0], skel, gltf, matname)
 						gltf.update (mdl)
 
 					gltf['scene'] = 0
 					gltf['scenes'] = [{'nodes': [x for x in range (len (gltf['nodes']))]}]
 
-					with open (os.path.join (actor_path, f'{k}_{anim}.gltf'), 'w') as f:
-						f.write (json.dumps (gltf))
+					json_save (os.path.join (actor_path, f'{k}_{anim}.gltf'), gltf)
 
 				except Exception as e:
 					print (f'ERROR: {e}')
@@ -1213,10 +1291,15 @@ def main ():
 	p.add_argument ('--textures', default=True, action=argparse.BooleanOptionalAction, help='Toggles texture conversion')
 	p.add_argument ('--models', default=True, action=argparse.BooleanOptionalAction, help='Toggles model conversion')
 	p.add_argument ('--actors', default=True, action=argparse.BooleanOptionalAction, help='Toggles actor conversion')
+	p.add_argument ('--fast-png', default=False, action=argparse.BooleanOptionalAction, help='Writes textures with Pillow at a low compression level')
+	p.add_argument ('--verbose', default=False, action=argparse.BooleanOptionalAction, help='Prints every file as it is processed')
 	
 	args = p.parse_args ()
+	if args.fast_png and Image is None:
+		print ('Pillow is not installed; falling back to pypng...')
 	
-	global fspaths
+	global fspaths, verbose
+	verbose = args.verbose
 	for a in args.files:
 		bn = os.path.splitext (os.path.split (a)[1])[0].lower ()
 		fspaths.append (os.path.join (args.prefix, bn))